@@ -1,5 +1,7 @@
-import queue
-from typing import Set
+from array import array
+from collections import deque
+from functools import lru_cache
+from typing import FrozenSet, NamedTuple
 from tokenizer import Token
 
 grammar = [("startsup", ("start", )),
@@ -10,51 +12,70 @@ terminals = ("if", "(", "C", ")", "S1", "else", "S2", '$')
 n_terminals = ("startsup", "start", "stmt")
 all_symbols = terminals + n_terminals
 
+# cells of the compiled syntax table are signed 16 bit integers: shift and
+# goto cells hold the target state, reduce cells hold -(production + 1), and
+# the two lowest values mark an error and the accept.
+ERROR = -32767
+ACCEPT = -32768
+n_columns = len(all_symbols)
 
-class Item(object):
+productions_by_head = {nt: [p for p in grammar if p[0] == nt]
+                       for nt in n_terminals}
+symbol_index = {symbol: i for i, symbol in enumerate(all_symbols)}
+production_index = {production: i for i, production in enumerate(grammar)}
+
+
+class Item(NamedTuple):
     """The Canonical LR(1) Item definition.
 
     :param symbol: str, the left part of production.
-    :param body: str, the right part of production.
-    :param dot: int, current position in the item.
-    :param follow: str, possible input for the current configuration.
+    :param body: tuple, the right part of production.
+    :param pos: int, current position in the item.
+    :param follow: frozenset, possible inputs for the current configuration.
     """
-
-    def __init__(self, symbol, body, dot, follow):
-        self.symbol = symbol
-        self.body = body
-        self.pos = dot
-        self.follow = follow
+    symbol: str
+    body: tuple
+    pos: int
+    follow: frozenset
 
     def __str__(self):
         p = list(self.body)
         p.insert(self.pos, '◆')
         pr = ' '.join(p)
-        return "[{}]  {} -> {}".format( self.follow, self.symbol, pr)
+        return "[{}]  {} -> {}".format('/'.join(sorted(self.follow)),
+                                       self.symbol, pr)
 
     def __repr__(self):
         return "<Item:{} >\n".format(self.__str__())
 
+    # an Item is only equal to another Item, never to a plain tuple of the
+    # same fields, so Items can share a set or dict with tuple keys
     def __eq__(self, other):
-        if isinstance(other, Item):
-            return ((self.symbol == other.symbol) and
-                    (self.body == other.body) and
-                    (self.pos == other.pos) and
-                    (self.follow == other.follow))
-        else:
-            return False
+        return type(other) is Item and tuple.__eq__(self, other)
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
-    def __hash__(self):
-        return hash(self.__str__())
+    __hash__ = tuple.__hash__
 
 
 class Closure(object):
-    def __init__(self, sets: Set[Item], label: int = None):
+    """A set of Items, frozen once built.
+
+    The implied Items of a closure are fixed by its kernel, so closures are
+    compared and hashed by their kernel only.
+
+    :param sets: the Items of the closure.
+    :param label: int, the state number in the syntax table.
+    :param kernel: the Items the closure was built from, before adding the
+        implied Items.
+    """
+
+    def __init__(self, sets: FrozenSet[Item], label: int = None,
+                 kernel: FrozenSet[Item] = None):
         self.label = label
-        self.sets = sets
+        self.sets = frozenset(sets)
+        self.kernel = self.sets if kernel is None else kernel
         self.goto = dict()  # type: dict[str, int]
 
     def __len__(self):
@@ -71,13 +92,13 @@ class Closure(object):
                                                        self.__str__())
 
     def __eq__(self, other):
-        return self.sets == other.sets
+        return self.kernel == other.kernel
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(self.__str__())
+        return hash(self.kernel)
 
     def __contains__(self, item):
         return item in self.sets
@@ -91,82 +112,126 @@ def isterm(symbol):
     return symbol in terminals
 
 
+def nullable_table():
+    """Collect the none terminals that may produce an empty sequence.
+
+    A none terminal is nullable if it has an EPSILON production, or a
+    production whose symbols are all nullable. Iterates until no more none
+    terminal is added."""
+    nullable = {head for head, body in grammar if body == 'EPSILON'}
+    changed = True
+    while changed:
+        changed = False
+        for head, body in grammar:
+            if head in nullable or body == 'EPSILON':
+                continue
+            if all(symbol in nullable for symbol in body):
+                nullable.add(head)
+                changed = True
+    return nullable
+
+
+NULLABLE = nullable_table()
+
+
 def produce_epsilon(none_terminal):
-    return 'EPSILON' in [i[1] for i in grammar if i[0] == none_terminal]
+    return none_terminal in NULLABLE
+
+
+def first_table():
+    """Compute the first terminal sets of every symbol in the grammar.
+
+    Iterates over the productions until no set grows any more, so that each
+    set is computed once instead of on every call of firsts."""
+    table = {symbol: set() for symbol in n_terminals}
+    table.update({symbol: {symbol} for symbol in terminals})
+    for symbol in NULLABLE:
+        table[symbol].add('EPSILON')
+    changed = True
+    while changed:
+        changed = False
+        for head, body in grammar:
+            if body == 'EPSILON':
+                continue
+            size = len(table[head])
+            for symbol in body:
+                table[head] |= table[symbol] - {'EPSILON'}
+                if symbol not in NULLABLE:
+                    break
+            if len(table[head]) != size:
+                changed = True
+    return table
+
+
+FIRST = first_table()
 
 
 def first(symbol):
     """Return the first terminal sets that may occur in the Symbol."""
-    first_sets = set()
-    if isterm(symbol):
-        return set(symbol)
-    elif produce_epsilon(symbol):
-        first_sets = first_sets.union('EPSILON')
-    elif isnterm(symbol):
-        for i in grammar:
-            if i[0] == symbol:
-                body = i[1]
-                epsilons = True
-                current = 0
-                while epsilons is True and current < len(body):
-                    if body[current] != symbol:
-                        first_sets = first_sets.union(first(body[current]))
-                    if not produce_epsilon(body[current]):
-                        epsilons = False
-                    current += 1
-    return first_sets
+    return FIRST[symbol]
 
 
 def firsts(suffix):
-    if len(suffix) == 1:
-        return first(suffix[0])
-    else:
-        if not produce_epsilon(suffix[0]):
-            return first(suffix[0])
-        else:
-            return first(suffix[0]).union(firsts(suffix[1:]))
+    """Return the first terminal sets that may occur in a symbol sequence."""
+    first_sets = set()
+    for symbol in suffix:
+        first_sets |= FIRST[symbol] - {'EPSILON'}
+        if not produce_epsilon(symbol):
+            return first_sets
+    first_sets.add('EPSILON')
+    return first_sets
 
 
 def get_closure(cl: Closure, label: int) -> Closure:
     """get all Item of a Closure from given Items, by adding implied Items.
 
     The implied Items are the productions of the None terminals after the
-    current position, which put a dot on the head."""
-    def get_nterm(item):
-        pos, prod = (item.pos, item.body)
+    current position, which put a dot on the head. Items sharing the same
+    production and position are merged into one Item holding the union of
+    their lookaheads."""
+    def get_nterm(core):
+        _, prod, pos = core
         if pos < len(prod):
             symbol = prod[pos]
             if isnterm(symbol):
                 return symbol
         return None
-    item_set = set()
-    q = queue.Queue()
+    lookaheads = dict()  # type: dict[tuple, set]
+    q = deque()
     for i in cl.sets:
-        item_set.add(i)
-        q.put(i)
-    while not q.empty():
-        item = q.get()
-        symbol = get_nterm(item)
+        core = (i.symbol, i.body, i.pos)
+        lookaheads.setdefault(core, set()).update(i.follow)
+        q.append(core)
+    while q:
+        core = q.popleft()
+        symbol = get_nterm(core)
         if symbol:
-            products = [i for i in grammar if i[0] == symbol]
-            suffix = item.body[item.pos+1:] + tuple(item.follow)
-            termins = firsts(suffix)
+            _, body, pos = core
+            products = productions_by_head[symbol]
+            termins = firsts(body[pos+1:])
+            if 'EPSILON' in termins:
+                termins = (termins - {'EPSILON'}) | lookaheads[core]
             for product in products:
-                for terminal in termins:
-                    new_item = Item(symbol, product[1], 0, terminal)
-                    if new_item not in item_set:
-                        item_set.add(new_item)
-                        q.put(new_item)
-    c = Closure(item_set, label)
+                new_core = (symbol, product[1], 0)
+                follow = lookaheads.setdefault(new_core, set())
+                # requeue the item whenever its lookahead set grows
+                if not termins <= follow:
+                    follow |= termins
+                    q.append(new_core)
+    item_set = frozenset(Item(*core, frozenset(follow))
+                         for core, follow in lookaheads.items())
+    c = Closure(item_set, label, kernel=cl.sets)
     return c
 
 
-def goto(clos: Closure, letter: str) -> Closure:
-    """a closure that could get from the current closure by input a letter.
+def goto_kernel(clos: Closure, letter: str) -> frozenset:
+    """the Items of the current closure advanced by input a letter.
+
+    These are the kernel of the goto closure, before adding implied Items.
 
     :param clos: the current closure.
     :param letter: the input letter.
-    :return: Closure.
+    :return: frozenset of Item.
     """
     item_set = set()
     for item in clos.sets:
@@ -177,72 +242,82 @@ def goto(clos: Closure, letter: str) -> Closure:
                             item.pos + 1,
                             item.follow)
             item_set.add(new_item)
-    c = Closure(item_set)
-    return get_closure(c, label=None)
+    return frozenset(item_set)
 
 
-def closure_groups():
-    def find_label(closure, group):
-        for i in group:
-            if closure == i:
-                return i.label
+def goto(clos: Closure, letter: str) -> Closure:
+    """a closure that could get from the current closure by input a letter.
+
+    :param clos: the current closure.
+    :param letter: the input letter.
+    :return: Closure, or None if no Item could advance by the letter.
+    """
+    kernel = goto_kernel(clos, letter)
+    if not kernel:
         return None
-    group = set()
+    return get_closure(Closure(kernel), label=None)
+
+
+def closure_groups():
+    """Collect the closures reachable from the start Item.
+
+    A closure is fully determined by its kernel, so closures are looked up
+    by kernel and get_closure only runs for kernels not seen before."""
     label = 0
-    start_item = Item('startsup', ('start',), 0, '$')
+    start_item = Item('startsup', ('start',), 0, frozenset({'$'}))
     start = get_closure(Closure({start_item}), label)
-    q = queue.Queue()
-    q.put(start)
-    group.add(start)
-    while not q.empty():
-        c = q.get()
-        for literal in all_symbols: # terminals + n_terminals:
-            go_clos = goto(c, literal)
-            if go_clos:
-                if go_clos not in group:
-                    label += 1
-                    go_clos.label = label
-                    q.put(go_clos)
-                    group.add(go_clos)
-                    c.goto[literal] = label
-                    # print('add closure', go_clos)
-                else:
-                    go_label = find_label(go_clos, group)
-                    if go_label:
-                        c.goto[literal] = go_label
-    return group
+    kernels = {start.kernel: start}  # type: dict[frozenset, Closure]
+    q = deque([start])
+    while q:
+        c = q.popleft()
+        # only the symbols after a dot lead to a non empty closure
+        literals = {item.body[item.pos] for item in c
+                    if item.pos < len(item.body)}
+        for literal in sorted(literals, key=symbol_index.get):
+            kernel = goto_kernel(c, literal)
+            go_clos = kernels.get(kernel)
+            if go_clos is None:
+                label += 1
+                go_clos = get_closure(Closure(kernel), label)
+                kernels[go_clos.kernel] = go_clos
+                q.append(go_clos)
+            c.goto[literal] = go_clos.label
+    return set(kernels.values())
 
 
 def get_states_map(closure_group):
     def get_state_map(closure):
-        """ table row like all_symbols list state maps."""
+        """ table row like all_symbols list state maps.
+
+        Raises ValueError if two actions land in one cell, as the Items are
+        visited in no fixed order and either one could win."""
         row = ["." for i in all_symbols]
-        # None terminals GOTO action and Terminals shift action.
-        for input, goto_label in closure.goto.items():
-            row_pos = all_symbols.index(input)
-            for item in closure:
-                if item.pos < len(item.body):      # shape like [A -> ⍺.aβ b]
-                    if item.body[item.pos] == input:
-                        # None terminals GOTO state
-                        if input in n_terminals:
-                            row[row_pos] = str(goto_label)
-                        # Terminals action shift state
-                        elif input in terminals:
-                            row[row_pos] = "s" + str(goto_label)
-        # Terminals reduce action. shape like  [A -> ⍺.  a]
-        for row_pos, input in enumerate(all_symbols):
-            for item in closure:
-                if item.pos == len(item.body) and \
-                        item.follow == input and \
-                        item.symbol != 'startsup':
-                    production_num = grammar.index((item.symbol, item.body))
-                    row[row_pos] = 'r' + str(production_num)
-        # accept condition 'startsup -> start. , $'
-        acc_item = Item('startsup', ('start',), 1, '$')
-        if acc_item in closure:
-            input = '$'
-            row_pos = all_symbols.index('$')
-            row[row_pos] = '$'
+
+        def put(symbol, cell):
+            column = symbol_index[symbol]
+            if row[column] not in (".", cell):
+                message = "conflict in state {} on {}: {} and {}"
+                raise ValueError(message.format(closure.label, symbol,
+                                                row[column], cell))
+            row[column] = cell
+        for item in closure:
+            if item.pos < len(item.body):      # shape like [A -> ⍺.aβ b]
+                input = item.body[item.pos]
+                goto_label = closure.goto[input]
+                # None terminals GOTO state
+                if input in n_terminals:
+                    put(input, str(goto_label))
+                # Terminals action shift state
+                else:
+                    put(input, "s" + str(goto_label))
+            # Terminals reduce action. shape like  [A -> ⍺.  a]
+            elif item.symbol != 'startsup':
+                production_num = production_index[(item.symbol, item.body)]
+                for input in item.follow:
+                    put(input, 'r' + str(production_num))
+            # accept condition 'startsup -> start. , $'
+            elif '$' in item.follow:
+                put('$', '$')
         return row
 
     state_map = [None for i in range(len(closure_group))]
@@ -252,10 +327,37 @@ def get_states_map(closure_group):
     return state_map
 
 
+def compile_states_map(state_map):
+    """Pack the table row by row into a flat array of 16 bit cells.
+
+    The cell of a state and a symbol is at state * n_columns plus the
+    symbol_index of the symbol. The parse loop tells the actions apart by
+    the value of the cell instead of parsing strings like 's5' and 'r3' on
+    every token."""
+    def compile_cell(cell):
+        if cell == '.':
+            return ERROR
+        elif cell == '$':
+            return ACCEPT
+        elif cell[0] == 's':
+            return int(cell[1:])
+        elif cell[0] == 'r':
+            return -int(cell[1:]) - 1
+        else:
+            return int(cell)
+    return array('h', [compile_cell(cell)
+                       for row in state_map for cell in row])
+
+
+@lru_cache(maxsize=None)
 def generate_syntax_table():
+    """Build the syntax table of the grammar.
+
+    The grammar is fixed, so the table is built once and shared by every
+    parser instance."""
     g = closure_groups()
     state_map = get_states_map(g)
-    return state_map
+    return compile_states_map(state_map)
 
 
 class SDT:
@@ -267,46 +369,45 @@ class SDT:
         self.translation = ''
 
     def get_action(self, state, literal):
-        return self.syntax_table[state][all_symbols.index(literal)]
+        return self.syntax_table[state * n_columns + symbol_index[literal]]
 
     def ahead(self, token):
-        action = self.get_action(self.state_stack[-1], token.typ)
-        # shift action push a current state into state_stack
-        if action[0] == 's':
-            current_state = int(action[1:])
-            self.state_stack.append(current_state)
-            self.push_arg(token)
-        elif action[0] == '$':
-            self.translation = startsup(self.arg_stack[-1])
-            self.accept = True   # success
-            print('SUCCESS')
-            print(self.translation)
-        # reduce action reduct a production and push
-        elif action[0] == 'r':
-            # get the production in grammar
-            number = int(action[1:])
-            production = grammar[number]
-            head, body = production
-            # pop the states of production body
-            for _ in body:
-                self.state_stack.pop()
-            # push the state of head GOTO(I,X)
-            state = self.get_action(self.state_stack[-1], head)
-            self.state_stack.append(int(state))
-
-            # translations
-            args = []
-            for _ in body:
-                arg = self.arg_stack.pop()
-                args.insert(0, arg)
-            translation = globals().get(head).__call__(*args)
-            self.arg_stack.append(translation)
-
-            # reduce actions does not consume a token,
-            # only when shifting, a token was consume and passed
-            self.ahead(token)
-        else:
-            raise SyntaxError(f"Not a correct token '{token.__str__()}'.")
+        while True:
+            cell = self.get_action(self.state_stack[-1], token.typ)
+            # shift action push a current state into state_stack
+            if cell >= 0:
+                self.state_stack.append(cell)
+                self.push_arg(token)
+                return
+            elif cell == ACCEPT:
+                self.translation = startsup(self.arg_stack[-1])
+                self.accept = True   # success
+                print('SUCCESS')
+                print(self.translation)
+                return
+            # reduce action reduct a production and push
+            elif cell != ERROR:
+                # get the production in grammar
+                head, body = grammar[-cell - 1]
+                # pop the states of production body
+                for _ in body:
+                    self.state_stack.pop()
+                # push the state of head GOTO(I,X)
+                state = self.get_action(self.state_stack[-1], head)
+                self.state_stack.append(state)
+
+                # translations
+                args = []
+                for _ in body:
+                    args.insert(0, self.arg_stack.pop())
+                translation = globals().get(head).__call__(*args)
+                self.arg_stack.append(translation)
+
+                # reduce actions does not consume a token,
+                # only when shifting, a token was consume and passed
+            else:
+                raise SyntaxError(
+                    f"Not a correct token '{token.__str__()}'.")
 
     def parse(self, token_stream):
         while True:
@@ -2,13 +2,19 @@
 
 """
 
-import re
 import string
+from collections import deque
+from functools import lru_cache
 
-from regex.parsing_table import (semantic, all_symbols, grammar,
-                                  generate_syntax_table)
+from regex.parsing_table import (semantic, symbol_index, grammar,
+                                  n_terminals, generate_syntax_table,
+                                  n_columns, ACCEPT, ERROR)
 from regex.graph import Machine
-from regex.regex_nfa import induct_star, induct_or, induct_cat, basis
+
+# number of arguments each semantic action takes from the arg stack
+semantic_arity = [len([s for s in body if s in n_terminals or s == 'a'])
+                  for _, body in grammar]
+
 
 class EscapeError(Exception):
     pass
@@ -25,13 +31,13 @@ class Lexer:
     """parse a letter and return a lexeme."""
 
     def __init__(self, stream):
-        self.stream = list(stream)
+        self.stream = deque(stream)
 
     def get_lexeme(self):
         try:
-            letter = self.stream.pop(0)
+            letter = self.stream.popleft()
             if letter == "\\":
-                letter = self.stream.pop(0)
+                letter = self.stream.popleft()
                 if letter in "()|*$":
                     return Lexeme("a", letter)
                 else:
@@ -47,7 +53,7 @@ class Lexer:
 
 
 class RegexCompiler:
-    """Regex compiler reads a regex pattern, and return an nfa Machine of graph.
+    """Regex compiler reads a regex pattern, and builds its nfa graph.
 
 
     """
@@ -56,7 +62,7 @@ class RegexCompiler:
         self.syntax_table = generate_syntax_table()
         self.state_stack = [0]
         self.arg_stack = []
-        self.literal_machine = ""
+        self.graph = None
 
     def parse(self, stream):
         lexer = Lexer(stream)
@@ -72,46 +78,63 @@ class RegexCompiler:
                 raise EscapeError(e)
 
     def get_action(self, state, literal):
-        return self.syntax_table[state][all_symbols.index(literal)]
+        return self.syntax_table[state * n_columns + symbol_index[literal]]
 
     def ahead(self, literal, value=None):
-        action = self.get_action(self.state_stack[-1], literal)
-        if action[0] == 's':  # shift action
-            self.state_stack.append(int(action[1:]))
-            if literal == 'a':
-                self.arg_stack.append(value)
-        elif action[0] == '$':
-            machine_literal = self.arg_stack.pop()
-            self.literal_machine = machine_literal
-            # success
-        elif action[0] == 'r':
-            number = int(action[1:])
-            production = grammar[number]
-            head = production[0]
-            body = production[1]
-            for _ in body:
-                self.state_stack.pop()
-            state = self.get_action(self.state_stack[-1], head)
-            self.state_stack.append(int(state))
-
-            # translations
-            args = []
-            for i in re.findall(r"{}", semantic[number]):
-                arg = self.arg_stack.pop()
-                args.insert(0, arg)
-            translation = semantic[number].format(*args)
-            self.arg_stack.append(translation)
-
-            self.ahead(literal, value)
+        while True:
+            cell = self.get_action(self.state_stack[-1], literal)
+            if cell >= 0:  # shift action
+                self.state_stack.append(cell)
+                if literal == 'a':
+                    self.arg_stack.append(value)
+                return
+            elif cell == ACCEPT:
+                self.graph = self.arg_stack.pop()
+                # success
+                return
+            elif cell != ERROR:  # reduce action
+                arg = -cell - 1
+                head, body = grammar[arg]
+                for _ in body:
+                    self.state_stack.pop()
+                state = self.get_action(self.state_stack[-1], head)
+                self.state_stack.append(state)
+
+                # translations
+                args = [self.arg_stack.pop()
+                        for _ in range(semantic_arity[arg])]
+                args.reverse()
+                translation = semantic[arg](*args)
+                self.arg_stack.append(translation)
+            else:  # error action
+                raise SyntaxError(
+                    "unexpected {} in regex pattern".format(
+                        "end" if literal == "$" else repr(value)))
+
+
+@lru_cache(maxsize=256)
+def _parse_graph(regex):
+    """Parse a regex pattern to its nfa graph, with sorted state names.
+
+    The graphs of recently used patterns are kept, so compiling the same
+    pattern again skips the parse. They are shared by every call and are
+    never handed out, regex_compile copies them."""
+    a = RegexCompiler()
+    a.parse(regex)
+    graph = a.graph
+    if graph is None:
+        raise SyntaxError("invalid regex pattern {}".format(regex))
+    graph.sort_state_names()
+    return graph
 
 
 def regex_compile(regex):
-    a = RegexCompiler()
-    a.parse(regex)
-    m = eval(a.literal_machine)
-    m.sort_state_names()
-    return Machine(m)
+    """Compile a regex pattern to a new nfa Machine.
 
+    Every call returns a Machine on a copy of the cached graph of the
+    pattern, so the Machine, its paths and its states may be changed, or
+    passed to the nfa builders, without touching the cache."""
+    return Machine(_parse_graph(regex).copy())
 
 if __name__ == "__main__":
     import sys
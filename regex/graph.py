@@ -13,12 +13,11 @@ Machine constructs and runs upon the Graph. it could calculate the current
 
 """
 
-import queue
+from collections import deque
 import string
 import random
 import subprocess
 from PIL import Image
-from functools import reduce
 
 
 epsilon = "ε"
@@ -33,23 +32,22 @@ class NotMatchException(Exception):
 
 
 class State(object):
-    """A container that includes the state name."""
+    """A container that includes the state name.
+
+    States compare and hash by identity, two states with the same name are
+    still different states."""
+
+    __slots__ = ('number', )
 
     def __init__(self, number: int = None):
         self.number = number
 
-    def __eq__(self, other):
-        return id(self) == id(other)
-
     def __str__(self):
         return str(self.number)
 
     def __repr__(self):
         return str(self.number)
 
-    def __hash__(self):
-        return hash(id(self))
-
     def rename(self, number):
         self.number = number
 
@@ -57,6 +55,8 @@ class State(object):
 class Path:
     """Draw a base nfa path."""
 
+    __slots__ = ('begin', 'end', 'label')
+
     def __init__(self, begin: State, end: State, label: str):
         self.begin = begin
         self.end = end
@@ -74,32 +74,92 @@ class Graph:
 
     Contains Paths, Start state, End state.
 
+    Paths are also indexed by begin state, by end state and by (begin state,
+    label). The indexes are built on first use, and dropped by add_paths and
+    alter_init_state, which change the paths.
+
     :param paths: a list with Path type elements.
     :param init: the init State type object.
     :param finish: the finished State type object.
     """
 
+    __slots__ = ('paths', 'start', 'finish',
+                 '_forwards', '_backwards', '_by_label')
+
     def __init__(self, paths, start, finish):
         self.paths = paths
         self.start = start
         self.finish = finish
+        self._forwards = None  # type: dict[State, list[Path]]
+        self._backwards = None  # type: dict[State, list[Path]]
+        self._by_label = None  # type: dict[tuple[State, str], list[State]]
+
+    def copy(self):
+        """A graph of new States and Paths with the same names and labels.
+
+        Nothing is shared with this graph, so either may be changed."""
+        states = dict()
+
+        def state(old):
+            new = states.get(old)
+            if new is None:
+                new = states[old] = State(old.number)
+            return new
+        paths = [Path(state(path.begin), state(path.end), path.label)
+                 for path in self.paths]
+        return Graph(paths, state(self.start), state(self.finish))
 
     def get_states(self):
         """Get all states in every path in the graph."""
-        states = set()
-        for path in self.paths:
-            states.add(path.begin)
-            states.add(path.end)
-        return states
+        return set(self.get_forwards()).union(self.get_backwards())
+
+    def get_forwards(self):
+        """Map every state to the paths that begin from it."""
+        if self._forwards is None:
+            self._forwards = dict()
+            for path in self.paths:
+                self._forwards.setdefault(path.begin, []).append(path)
+        return self._forwards
+
+    def get_backwards(self):
+        """Map every state to the paths that end at it."""
+        if self._backwards is None:
+            self._backwards = dict()
+            for path in self.paths:
+                self._backwards.setdefault(path.end, []).append(path)
+        return self._backwards
+
+    def get_by_label(self):
+        """Map every state and label to the states reached through them."""
+        if self._by_label is None:
+            self._by_label = dict()
+            for path in self.paths:
+                key = (path.begin, path.label)
+                self._by_label.setdefault(key, []).append(path.end)
+        return self._by_label
+
+    def add_paths(self, paths):
+        """Append paths to the graph."""
+        self.paths.extend(paths)
+        self.reset_indexes()
 
     def alter_init_state(self, state):
         """Move init state to other state. Intended to concat two graphs."""
-        for i in self.paths:
-            if i.begin is self.start:
-                i.begin = state
-            elif i.end is self.start:
-                i.end = state
+        for path in self.paths:
+            if path.begin is self.start:
+                path.begin = state
+            if path.end is self.start:
+                path.end = state
         self.start = state
+        self.reset_indexes()
+
+    def reset_indexes(self):
+        """Drop the indexes of the paths, they are built again on next use.
+
+        Called whenever the paths change."""
+        self._forwards = None
+        self._backwards = None
+        self._by_label = None
 
     def get_dot_content(self):
         """generate dot file content in a list."""
@@ -112,7 +172,7 @@ class Graph:
         states = self.get_states()
         digraph.append('StartArrow [style = invis];')
         for state in states:
-            if state == self.finish:
+            if state is self.finish:
                 s = '{} [shape = "doublecircle"];'
                 digraph.append(s.format(state))
             else:
@@ -149,19 +209,19 @@ class Graph:
     def sort_state_names(self):
         # map(lambda x: x.rename(0), self.get_states())
         visited = set()
+        paths = self.get_forwards()
         self.start.rename(1)
         name = 2
-        q = queue.Queue()
-        q.put(self.start)
-        while not q.empty():
-            u = q.get()
-            forwards = [p.end for p in self.paths if p.begin is u]
+        q = deque([self.start])
+        while q:
+            u = q.popleft()
+            forwards = [p.end for p in paths.get(u, ())]
             for v in forwards:
                 if v not in visited:
                     v.rename(name)
                     name += 1
                     visited.add(v)
-                    q.put(v)
+                    q.append(v)
 
 
 class Machine(Graph):
@@ -172,12 +232,26 @@ class Machine(Graph):
     input reached the end, then check that whether the finish state is in the
     closure. If so, then return success, else the input fails to pass in this
     machine.
+
+    match runs a whole input stream on a dfa subset constructed from the
+    machine on first use, one transition lookup per letter.
     """
 
     def __init__(self, graph):
         """initialize from graph."""
         super(Machine, self).__init__(graph.paths, graph.start, graph.finish)
+        self.reset_indexes()
+
+    def reset_indexes(self):
+        """Drop the indexes of the paths, and build the ε-closures and the
+        current state again on the new paths. The dfa is built again on next
+        use."""
+        super(Machine, self).reset_indexes()
+        self.by_label = self.get_by_label()
+        self.epsilon_closures = self.get_epsilon_closures()
         self.current = self.e_closure({self.start, })
+        self.dfa = None  # type: list[dict[str, int]]
+        self.accepts = None  # type: set[int]
 
     @classmethod
     def frompaths(cls, paths, init, finish):
@@ -199,7 +273,7 @@ class Machine(Graph):
         states = self.get_states()
         digraph.append('StartArrow [style = invis];')
         for state in states:
-            if state == self.finish:
+            if state is self.finish:
                 s = '{} [shape = "doublecircle"];'
                 if state in self.current:
                     s = '{} [shape = "doublecircle"; color=red];'
@@ -216,54 +290,81 @@ class Machine(Graph):
         digraph.append(enclose)
         return digraph
 
-    def e_closure(self, clos: set):
-        """The states that could get through a path labeled e from the clos. """
-
-        def recur_forwards(target: set):
-            """walk all states through paths which labeled e."""
-
-            def forwards(cl: set):  # cl -- closure
-                """return states at path ends through e by states in cl."""
-
-                def forward(stt: State):
-                    """return states reached from stt through e by paths."""
-                    s = set([i.end for i in self.paths
-                             if i.begin == stt and is_epsilon(i.label)])
-                    return s
-
-                iterate = map(forward, list(cl))
-                step_closure = reduce(lambda x, y: x.union(y), iterate)
-                return step_closure
-
-            next = forwards(target)
-            if next.issubset(target):
-                return target
-            else:
-                target = target.union(next)
-                return recur_forwards(target)
-
-        return recur_forwards(clos)
+    def get_epsilon_closures(self):
+        """Map every state to the states it could get through paths labeled e.
+
+        Computed once for the machine, so that e_closure is a union of
+        precomputed sets instead of a walk over the paths."""
+        closures = dict()
+        for state in self.get_states():
+            closure = {state}
+            stack = [state]
+            while stack:
+                u = stack.pop()
+                for v in self.by_label.get((u, epsilon), ()):
+                    if v not in closure:
+                        closure.add(v)
+                        stack.append(v)
+            closures[state] = frozenset(closure)
+        return closures
+
+    def e_closure(self, clos):
+        """The states that could get through a path labeled e from the clos.
+
+        :return: frozenset of State.
+        """
+        return frozenset().union(*[self.epsilon_closures[s] for s in clos])
 
     def step_by(self, letter):
         """Goto next state closure by input letter."""
-        try:
-            self.current = self.e_closure(set([path.end for path in self.paths
-                                              if path.begin in self.current and
-                                               path.label == letter]))
-        except TypeError:
+        forwards = [v for u in self.current
+                    for v in self.by_label.get((u, letter), ())]
+        if not forwards:
             raise NotMatchException("""does not match this letter "{}"."""
                                     .format(letter))
+        self.current = self.e_closure(forwards)
+
+    def get_dfa(self):
+        """Subset construct a dfa from the machine.
+
+        Each dfa state is an ε-closure of machine states, numbered in the order
+        they are found, with 0 as the start closure.
+
+        :return: the transitions of every dfa state as a dict from letter to
+            dfa state, and the set of dfa states that contain the finish state.
+        """
+        letters = {path.label for path in self.paths}
+        start = self.e_closure({self.start, })
+        numbers = {start: 0}
+        subsets = [start]
+        dfa = []
+        accepts = set()
+        n = 0
+        while n < len(subsets):
+            subset = subsets[n]
+            if self.finish in subset:
+                accepts.add(n)
+            transitions = dict()
+            for letter in letters:
+                forwards = [v for u in subset
+                            for v in self.by_label.get((u, letter), ())]
+                if not forwards:
+                    continue
+                target = self.e_closure(forwards)
+                if target not in numbers:
+                    numbers[target] = len(subsets)
+                    subsets.append(target)
+                transitions[letter] = numbers[target]
+            dfa.append(transitions)
+            n += 1
+        return dfa, accepts
 
     def match(self, stream):
-        try:
-            for letter in stream:
-                self.step_by(letter)
-            if self.finish in self.current:
-                self.current = self.e_closure({self.start, })
-                return True
-            else:
-                self.current = self.e_closure({self.start, })
+        if self.dfa is None:
+            self.dfa, self.accepts = self.get_dfa()
+        state = 0
+        for letter in stream:
+            state = self.dfa[state].get(letter)
+            if state is None:
                 return False
-        except NotMatchException:
-            self.current = self.e_closure({self.start, })
-            return False
+        return state in self.accepts
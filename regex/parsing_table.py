@@ -1,9 +1,13 @@
 """Grammar parsing table of regular expression.
 
 """
-from typing import Set
+from typing import FrozenSet
+from array import array
+from functools import lru_cache
+from collections import deque
 import string
-import queue
+
+from regex.regex_nfa import induct_star, induct_or, induct_cat, basis
 
 
 grammar_literal = ('R -> S',
@@ -19,14 +23,23 @@ terminals = ("(", ")", "|", "*", "a", "$")
 n_terminals = ("S", "R", "D", "K")
 all_symbols = terminals + n_terminals
 
-semantic = ('''Machine({})''',
-            '''induct_or({}, {})''',
-            '''induct_cat({}, {})''',
-            '''{}''',
-            '''induct_star({})''',
-            '''{}''',
-            '''{}''',
-            '''basis("{}")''')
+# cells of the compiled syntax table are signed 16 bit integers: shift and
+# goto cells hold the target state, reduce cells hold -(production + 1), and
+# the two lowest values mark an error and the accept.
+ERROR = -32767
+ACCEPT = -32768
+n_columns = len(all_symbols)
+
+# semantic actions of the productions, called with the values of the body
+# symbols that carry one: the nonterminals and the letter 'a'.
+semantic = (lambda s: s,
+            induct_or,
+            induct_cat,
+            lambda d: d,
+            induct_star,
+            lambda k: k,
+            lambda s: s,
+            basis)
 
 
 def _divide(product):
@@ -36,6 +49,16 @@ def _divide(product):
 
 grammar = [_divide(i) for i in grammar_literal]
 
+symbol_index = {symbol: i for i, symbol in enumerate(all_symbols)}
+production_index = {(head, body): i for i, (head, body) in enumerate(grammar)}
+productions_by_head = {nt: [body for head, body in grammar if head == nt]
+                       for nt in n_terminals}
+
+# terminal sets are bit masks, with the bit of each terminal at its index in
+# all_symbols and one more bit for epsilon
+terminal_bit = {symbol: 1 << symbol_index[symbol] for symbol in terminals}
+EPSILON_BIT = 1 << len(all_symbols)
+
 a = string.ascii_lowercase
 
 
@@ -47,80 +70,96 @@ def isterm(symbol):
     return symbol in terminals
 
 
+def nullable_table():
+    """Collect the none terminals that may produce an empty sequence.
+
+    A none terminal is nullable if it has an epsilon production, or a
+    production whose symbols are all nullable. Iterates until no more none
+    terminal is added."""
+    nullable = {head for head, body in grammar if body == 'epsilon'}
+    changed = True
+    while changed:
+        changed = False
+        for head, body in grammar:
+            if head in nullable or body == 'epsilon':
+                continue
+            if all(symbol in nullable for symbol in body):
+                nullable.add(head)
+                changed = True
+    return nullable
+
+
+NULLABLE = nullable_table()
+
+
 def produce_epsilon(none_terminal):
-    return 'epsilon' in [i[1] for i in grammar if i[0] == none_terminal]
+    return none_terminal in NULLABLE
+
+
+def bits(mask):
+    """Yield the index of every set bit of the mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def first_table():
+    """Compute the first terminal sets of every symbol in the grammar.
+
+    Iterates over the productions until no set grows any more."""
+    table = {symbol: 0 for symbol in n_terminals}
+    table.update({symbol: terminal_bit[symbol] for symbol in terminals})
+    for symbol in NULLABLE:
+        table[symbol] |= EPSILON_BIT
+    changed = True
+    while changed:
+        changed = False
+        for head, body in grammar:
+            if body == 'epsilon':
+                continue
+            mask = table[head]
+            for symbol in body:
+                mask |= table[symbol] & ~EPSILON_BIT
+                if symbol not in NULLABLE:
+                    break
+            if mask != table[head]:
+                table[head] = mask
+                changed = True
+    return table
 
 
-def is_start_symbol(symbol):
-    return symbol == "R"
+FIRST = first_table()
 
 
 def first(symbol):
-    """Return the first terminal sets that may occur in the Symbol."""
-    first_sets = set()
-    if isterm(symbol):
-        return set(symbol)
-    elif produce_epsilon(symbol):
-        first_sets = first_sets.union('epsilon')
-    elif isnterm(symbol):
-        for i in grammar:
-            if i[0] == symbol:
-                body = i[1]
-                epsilons = True
-                current = 0
-                while epsilons is True and current < len(body):
-                    if body[current] != symbol:
-                        first_sets = first_sets.union(first(body[current]))
-                    if not produce_epsilon(body[current]):
-                        epsilons = False
-                    current += 1
-    return first_sets
+    """Return the mask of first terminals that may occur in the Symbol."""
+    return FIRST[symbol]
 
 
 def firsts(suffix):
-    if len(suffix) == 1:
-        return first(suffix[0])
-    else:
-        if not produce_epsilon(suffix[0]):
-            return first(suffix[0])
-        else:
-            return first(suffix[0]).union(firsts(suffix[1:]))
-
-
-def follow(symbol):
-    """Return the sets of terminals that may occur after S. """
-    follow_sets = set()
-    if is_start_symbol(symbol):
-        follow_sets = follow_sets.union("$")
-    products = grammar[1:]    #  [i for i in grammar if 'S' in i[1]]
-    # 'S' means all nterms except augmented start symbol 'R'
-
-    for head, body in products:
-        for num, lit in enumerate(body):
-            if lit == symbol:    # match symbol
-                # body shape like  ⍺Bβ
-                if num < len(body) - 1:
-                    first_beta = first(body[num+1])
-                    if 'epsilon' in first_beta:
-                        follow_sets = follow_sets.union(first_beta - {'epsilon'})
-                        if head != symbol:
-                            follow_sets = follow_sets.union(follow(head))
-                    else:
-                        follow_sets = follow_sets.union(first_beta)
-                # body shape like ⍺B
-                elif num == len(body) - 1:
-                    if head != symbol:
-                        follow_sets = follow_sets.union(follow(head))
-    return follow_sets
+    """Return the mask of first terminals that may occur in a symbol sequence.
+
+    EPSILON_BIT is set if the whole sequence may be empty."""
+    mask = 0
+    for symbol in suffix:
+        mask |= FIRST[symbol] & ~EPSILON_BIT
+        if not produce_epsilon(symbol):
+            return mask
+    return mask | EPSILON_BIT
 
 
 class Item(object):
     """The Canonical LR(1) Item definition.
 
+    Items are hash-consed, build them with Item.make so that equal Items are
+    the same object.
+
     :param symbol: the left part of production.
     :param body: the right part of production.
     :param dot: current position in the item.
-    :param follow: possible input for the current configuration.
+    :param follow: the index of the possible input for the current
+        configuration in all_symbols.
     """
 
     def __init__(self, symbol, body, dot, follow):
@@ -128,23 +167,31 @@ class Item(object):
         self.body = body
         self.pos = dot
         self.follow = follow
+        self._key = (symbol, body, dot, follow)
+        self._hash = hash(self._key)
+
+    @classmethod
+    def make(cls, symbol, body, dot, follow):
+        """Return the canonical Item of the given fields."""
+        key = (symbol, body, dot, follow)
+        item = _item_pool.get(key)
+        if item is None:
+            item = _item_pool[key] = cls(symbol, body, dot, follow)
+        return item
 
     def __str__(self):
         p = list(self.body)
         p.insert(self.pos, '.')
         pr = ''.join(p)
         return "{} -> {:10s}{}".format(
-            self.symbol, pr, self.follow)
+            self.symbol, pr, all_symbols[self.follow])
 
     def __repr__(self):
         return "<Item: {} >\n".format(self.__str__())
 
     def __eq__(self, other):
         if isinstance(other, Item):
-            return ((self.symbol == other.symbol) and
-                    (self.body == other.body) and
-                    (self.pos == other.pos) and
-                    (self.follow == other.follow))
+            return self is other or self._key == other._key
         else:
             return False
 
@@ -152,18 +199,47 @@ class Item(object):
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(self.__str__())
+        return self._hash
+
+
+_item_pool = dict()  # type: dict[tuple, Item]
 
 
 class Closure(object):
-    def __init__(self, sets: Set[Item], label: int = None):
+    """A set of Items, frozen once built.
+
+    The implied Items of a closure are fixed by its kernel, so closures are
+    compared and hashed by their kernel only.
+
+    :param sets: the Items of the closure.
+    :param label: int, the state number in the syntax table.
+    :param kernel: the Items the closure was built from, before adding the
+        implied Items.
+    """
+
+    def __init__(self, sets: FrozenSet[Item], label: int = None,
+                 kernel: FrozenSet[Item] = None):
         self.label = label
-        self.sets = sets
+        self.sets = frozenset(sets)
+        self.kernel = self.sets if kernel is None else kernel
         self.goto = dict()  # type: dict[str, int]
+        self._advances = None  # type: dict[str, list[Item]]
 
     def __len__(self):
         return len(self.sets)
 
+    def get_advances(self):
+        """Group the Items by the symbol after their dot.
+
+        Built on first use and kept, as the Items of a closure never change."""
+        if self._advances is None:
+            self._advances = dict()
+            for item in self.sets:
+                if item.pos < len(item.body):
+                    symbol = item.body[item.pos]
+                    self._advances.setdefault(symbol, []).append(item)
+        return self._advances
+
     def __iter__(self):
         return self.sets.__iter__()
 
@@ -175,23 +251,88 @@ class Closure(object):
                                                        self.__str__())
 
     def __eq__(self, other):
-        return self.sets == other.sets
+        return self.kernel == other.kernel
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(self.__str__())
+        return hash(self.kernel)
 
     def __contains__(self, item):
         return item in self.sets
 
 
+def first_of_tail_table():
+    """Map every production body and position to the first terminal mask of
+    the tail of the body from that position.
+
+    Each body is swept once from its end, the mask of a tail is the first
+    mask of its head symbol joined with the mask of the rest when the head
+    symbol is nullable."""
+    table = dict()  # type: dict[tuple[str, int], int]
+    for head, body in grammar:
+        if body == 'epsilon':
+            continue
+        mask = EPSILON_BIT
+        table[(body, len(body))] = mask
+        for pos in range(len(body) - 1, -1, -1):
+            symbol = body[pos]
+            if produce_epsilon(symbol):
+                mask = (FIRST[symbol] & ~EPSILON_BIT) | mask
+            else:
+                mask = FIRST[symbol] & ~EPSILON_BIT
+            table[(body, pos)] = mask
+    return table
+
+
+FIRST_OF_TAIL = first_of_tail_table()
+
+
+def first_with_follow(body, pos, follow):
+    """Return the first terminal mask of the tail of body from pos, followed
+    by the terminal of index follow."""
+    mask = FIRST_OF_TAIL[(body, pos)]
+    if mask & EPSILON_BIT:
+        mask = (mask & ~EPSILON_BIT) | (1 << follow)
+    return mask
+
+
+def nt_closure_table():
+    """Map every none terminal and lookahead to the Items they imply.
+
+    The entry of (B, a) is the closure of the Items [B -> .γ, a] for every
+    production of B. The grammar is fixed, so these are computed once and
+    get_closure only has to look them up."""
+    table = dict()  # type: dict[tuple[str, int], frozenset[Item]]
+    for nt in n_terminals:
+        for terminal in terminals:
+            key = (nt, symbol_index[terminal])
+            item_set = set()
+            seen = {key}
+            stack = [key]
+            while stack:
+                symbol, follow = stack.pop()
+                for body in productions_by_head[symbol]:
+                    item_set.add(Item.make(symbol, body, 0, follow))
+                    if body and isnterm(body[0]):
+                        for t in bits(first_with_follow(body, 1, follow)):
+                            if (body[0], t) not in seen:
+                                seen.add((body[0], t))
+                                stack.append((body[0], t))
+            table[key] = frozenset(item_set)
+    return table
+
+
+NT_CLOSURE = nt_closure_table()
+
+
 def get_closure(cl: Closure, label: int) -> Closure:
     """get all Item of a Closure from given Items, by adding implied Items.
 
     The implied Items are the productions of the None terminals after the
-    current position, which put a dot on the head."""
+    current position, which put a dot on the head. They are looked up in
+    NT_CLOSURE by the None terminal and each possible lookahead."""
     def get_nterm(item):
         pos, prod = (item.pos, item.body)
         if pos < len(prod):
@@ -199,114 +340,238 @@ def get_closure(cl: Closure, label: int) -> Closure:
             if isnterm(symbol):
                 return symbol
         return None
-    item_set = set()
-    q = queue.Queue()
-    for i in cl.sets:
-        item_set.add(i)
-        q.put(i)
-    while not q.empty():
-        item = q.get()
+    item_set = set(cl.sets)
+    for item in cl.sets:
         symbol = get_nterm(item)
         if symbol:
-            products = [i for i in grammar if i[0] == symbol]
-            suffix = item.body[item.pos+1:] + item.follow
-            termins = firsts(suffix)
-            for product in products:
-                for terminal in termins:
-                    new_item = Item(symbol, product[1], 0, terminal)
-                    if new_item not in item_set:
-                        item_set.add(new_item)
-                        q.put(new_item)
-    c = Closure(item_set, label)
+            tail = first_with_follow(item.body, item.pos + 1, item.follow)
+            for terminal in bits(tail):
+                item_set |= NT_CLOSURE[(symbol, terminal)]
+    c = Closure(item_set, label, kernel=cl.kernel)
     return c
 
 
+def goto_kernel(clos: Closure, letter: str) -> FrozenSet[Item]:
+    """the Items of the current closure advanced by input a letter.
+
+    These are the kernel of the goto closure, before adding implied Items.
+
+    :param clos: the current closure.
+    :param letter: the input letter.
+    :return: frozenset of Item.
+    """
+    return frozenset(Item.make(item.symbol, item.body, item.pos + 1,
+                               item.follow)
+                     for item in clos.get_advances().get(letter, ()))
+
+
 def goto(clos: Closure, letter: str) -> Closure:
     """a closure that could get from the current closure by input a letter.
 
     :param clos: the current closure.
     :param letter: the input letter.
-    :return: Closure.
+    :return: Closure, or None if no Item could advance by the letter.
     """
-    item_set = set()
-    for item in clos.sets:
-        dot, prod = (item.pos, item.body)
-        if dot < len(prod) and prod[dot] == letter:
-            new_item = Item(item.symbol,
-                            item.body,
-                            item.pos + 1,
-                            item.follow)
-            item_set.add(new_item)
-    c = Closure(item_set)
+    kernel = goto_kernel(clos, letter)
+    if not kernel:
+        return None
+    c = Closure(kernel)
     return get_closure(c, label=None)
 
 
-def find_label(closure, group):
-    for i in group:
-        if closure == i:
-            return i.label
-    return None
-
-
 def closure_groups():
-    group = set()
+    group = dict()  # type: dict[FrozenSet[Item], Closure]
     label = 0
-    start = get_closure(Closure({Item('R', 'S', 0, '$')}), label)
-    q = queue.Queue()
-    q.put(start)
-    group.add(start)
-    while not q.empty():
-        c = q.get()
-        for literal in all_symbols: # terminals + n_terminals:
-            go_clos = goto(c, literal)
-            if go_clos:
-                if go_clos not in group:
-                    label += 1
-                    go_clos.label = label
-                    group.add(go_clos)
-                    q.put(go_clos)
-                    c.goto[literal] = label
+    start_item = Item.make('R', 'S', 0, symbol_index['$'])
+    start = get_closure(Closure({start_item}), label)
+    q = deque([start])
+    group[start.kernel] = start
+    while q:
+        c = q.popleft()
+        # only the symbols after a dot lead to a non empty closure, and the
+        # closure of a kernel already seen is not built again
+        for literal in sorted(c.get_advances(), key=symbol_index.get):
+            kernel = goto_kernel(c, literal)
+            go_clos = group.get(kernel)
+            if go_clos is None:
+                label += 1
+                go_clos = get_closure(Closure(kernel), label)
+                group[kernel] = go_clos
+                q.append(go_clos)
+            c.goto[literal] = go_clos.label
+    return set(group.values())
+
+
+# lookahead index of the placeholder used to find propagated lookaheads, its
+# bit is above EPSILON_BIT so it never stands for a terminal
+LOOKAHEAD_PLACEHOLDER = len(all_symbols) + 1
+
+
+def lr0_closure(kernel):
+    """The cores (symbol, body, pos) implied by a set of LR(0) kernel
+    cores, the kernel included."""
+    cores = set(kernel)
+    stack = list(kernel)
+    while stack:
+        symbol, body, pos = stack.pop()
+        if pos < len(body) and isnterm(body[pos]):
+            for production in productions_by_head[body[pos]]:
+                core = (body[pos], production, 0)
+                if core not in cores:
+                    cores.add(core)
+                    stack.append(core)
+    return cores
+
+
+def lookahead_closure(core, follow):
+    """The LR(1) closure of a single core with the lookahead of index follow,
+    as a set of (core, lookahead index) pairs."""
+    pairs = {(core, follow)}
+    stack = [(core, follow)]
+    while stack:
+        (symbol, body, pos), lookahead = stack.pop()
+        if pos < len(body) and isnterm(body[pos]):
+            tail = first_with_follow(body, pos + 1, lookahead)
+            for production in productions_by_head[body[pos]]:
+                for terminal in bits(tail):
+                    pair = ((body[pos], production, 0), terminal)
+                    if pair not in pairs:
+                        pairs.add(pair)
+                        stack.append(pair)
+    return pairs
+
+
+def closure_groups_lalr():
+    """Build the LALR(1) closures of the grammar.
+
+    The states are those of the LR(0) automaton, numbered in the same order
+    as closure_groups. The lookaheads of the kernel Items are found by
+    closing every kernel core under the placeholder lookahead: a terminal
+    lookahead reaching an advanced core in a goto state is generated there
+    spontaneously, the placeholder marks a core that the kernel core
+    propagates its own lookaheads to. Propagation is iterated until no
+    lookahead set grows any more, then each state is closed as usual."""
+    start_core = ('R', 'S', 0)
+    kernels = [frozenset({start_core})]
+    labels = {kernels[0]: 0}
+    gotos = []  # type: list[dict[str, int]]
+    n = 0
+    while n < len(kernels):
+        advances = dict()  # type: dict[str, set]
+        for symbol, body, pos in lr0_closure(kernels[n]):
+            if pos < len(body):
+                advances.setdefault(body[pos], set()).add(
+                    (symbol, body, pos + 1))
+        transitions = dict()
+        for literal in sorted(advances, key=symbol_index.get):
+            kernel = frozenset(advances[literal])
+            if kernel not in labels:
+                labels[kernel] = len(kernels)
+                kernels.append(kernel)
+            transitions[literal] = labels[kernel]
+        gotos.append(transitions)
+        n += 1
+
+    lookaheads = {(label, core): 0
+                  for label, kernel in enumerate(kernels) for core in kernel}
+    lookaheads[(0, start_core)] = terminal_bit['$']
+    propagates = {key: [] for key in lookaheads}
+    for label, kernel in enumerate(kernels):
+        for core in kernel:
+            pairs = lookahead_closure(core, LOOKAHEAD_PLACEHOLDER)
+            for (symbol, body, pos), lookahead in pairs:
+                if pos == len(body):
+                    continue
+                target = (gotos[label][body[pos]], (symbol, body, pos + 1))
+                if lookahead == LOOKAHEAD_PLACEHOLDER:
+                    propagates[(label, core)].append(target)
                 else:
-                    go_label = find_label(go_clos, group)
-                    if go_label:
-                        c.goto[literal] = go_label
+                    lookaheads[target] |= 1 << lookahead
+    changed = True
+    while changed:
+        changed = False
+        for key, targets in propagates.items():
+            mask = lookaheads[key]
+            for target in targets:
+                if lookaheads[target] | mask != lookaheads[target]:
+                    lookaheads[target] |= mask
+                    changed = True
+
+    group = set()
+    for label, kernel in enumerate(kernels):
+        items = {Item.make(*core, terminal)
+                 for core in kernel
+                 for terminal in bits(lookaheads[(label, core)])}
+        closure = get_closure(Closure(items), label)
+        closure.goto = gotos[label]
+        group.add(closure)
     return group
 
 
+def has_conflict(closure_group):
+    """Whether a closure has two different actions on the same terminal, a
+    shift and a reduce or two reduces."""
+    for closure in closure_group:
+        actions = dict()  # type: dict[int, str]
+        for item in closure:
+            if item.pos < len(item.body):
+                if isnterm(item.body[item.pos]):
+                    continue
+                column, action = symbol_index[item.body[item.pos]], 's'
+            elif item.symbol != 'R':
+                column = item.follow
+                action = production_index[(item.symbol, item.body)]
+            else:
+                column, action = item.follow, '$'
+            if actions.setdefault(column, action) != action:
+                return True
+    return False
+
+
+def syntax_closure_groups():
+    """The closures the syntax table is built from.
+
+    The LALR(1) closures are used unless merging the lookaheads brings in a
+    conflict, then the canonical LR(1) ones."""
+    g = closure_groups_lalr()
+    if has_conflict(g):
+        g = closure_groups()
+    return g
+
+
 def get_states_map(closure_group):
     def get_state_map(closure):
-        """ table row like all_symbols list state maps."""
+        """ table row like all_symbols list state maps.
+
+        Raises ValueError if two actions land in one cell, as the Items are
+        visited in no fixed order and either one could win."""
         row = ["." for i in all_symbols]
-        # None terminals GOTO action and Terminals shift action.
-        for input, goto_label in closure.goto.items():
-            row_pos = all_symbols.index(input)
-            for item in closure:
-                if item.pos < len(item.body):      # shape like [A -> ⍺.aβ b]
-                    if item.body[item.pos] == input:
-                        # None terminals GOTO state
-                        if input in n_terminals:
-                            row[row_pos] = str(goto_label)
-                        # Terminals action shift state
-                        elif input in terminals:
-                            row[row_pos] = "s" + str(goto_label)
-        # Terminals reduce action. shape like  [A -> ⍺.  a]
-        for row_pos, input in enumerate(all_symbols):
-            for item in closure:
-                if item.pos == len(item.body) and \
-                        item.follow == input and \
-                        item.symbol != 'R':
-                        # 'R' should be replaced with start_symbol
-                    #if item.follow != '*':
-                    production_num = grammar.index([item.symbol, item.body])
-                    row[row_pos] = 'r' + str(production_num)
-                    #else:
-                    #    pass
-        # accept condition 'R -> S. , $'
-        acc_item = Item('R', 'S', 1, '$')
-        if acc_item in closure:
-            input = '$'
-            row_pos = all_symbols.index('$')
-            row[row_pos] = '$'
+
+        def put(column, cell):
+            if row[column] not in (".", cell):
+                message = "conflict in state {} on {}: {} and {}"
+                raise ValueError(message.format(closure.label,
+                                                all_symbols[column],
+                                                row[column], cell))
+            row[column] = cell
+        for item in closure:
+            if item.pos < len(item.body):      # shape like [A -> ⍺.aβ b]
+                input = item.body[item.pos]
+                goto_label = closure.goto[input]
+                # None terminals GOTO state
+                if input in n_terminals:
+                    put(symbol_index[input], str(goto_label))
+                # Terminals action shift state
+                else:
+                    put(symbol_index[input], "s" + str(goto_label))
+            # Terminals reduce action. shape like  [A -> ⍺.  a]
+            # 'R' should be replaced with start_symbol
+            elif item.symbol != 'R':
+                production_num = production_index[(item.symbol, item.body)]
+                put(item.follow, 'r' + str(production_num))
+            # accept condition 'R -> S. , $'
+            elif item.follow == symbol_index['$']:
+                put(symbol_index['$'], '$')
         return row
 
     state_map = [None for i in range(len(closure_group))]
@@ -316,19 +581,94 @@ def get_states_map(closure_group):
     return state_map
 
 
+def minimize_states_map(state_map):
+    """Merge the states of the table that behave the same.
+
+    Partition refinement: the states start split by the actions of their
+    rows with the targets left out, and a block is split again while two of
+    its states shift or go to states in different blocks. The states of a
+    block are merged and renumbered in the order of their first state, so
+    the start state stays 0."""
+    def split(cell):
+        if cell[0] == 's':
+            return 's', int(cell[1:])
+        elif cell[0] in '.$r':
+            return cell, None
+        else:
+            return 'g', int(cell)
+
+    cells = [[split(cell) for cell in row] for row in state_map]
+    blocks = [tuple(kind for kind, _ in row) for row in cells]
+    n_blocks = len(set(blocks))
+    while True:
+        signatures = [(blocks[n], tuple(kind if target is None else
+                                        (kind, blocks[target])
+                                        for kind, target in row))
+                      for n, row in enumerate(cells)]
+        numbers = dict()
+        for signature in signatures:
+            numbers.setdefault(signature, len(numbers))
+        blocks = [numbers[signature] for signature in signatures]
+        if len(numbers) == n_blocks:
+            break
+        n_blocks = len(numbers)
+
+    def rename(cell):
+        kind, target = split(cell)
+        if target is None:
+            return cell
+        elif kind == 's':
+            return 's' + str(blocks[target])
+        return str(blocks[target])
+
+    minimized = [None for i in range(n_blocks)]
+    for n, row in enumerate(state_map):
+        if minimized[blocks[n]] is None:
+            minimized[blocks[n]] = [rename(cell) for cell in row]
+    return minimized
+
+
+def compile_states_map(state_map):
+    """Pack the table row by row into a flat array of 16 bit cells.
+
+    The cell of a state and a symbol is at state * n_columns plus the
+    symbol_index of the symbol. The parse loop tells the actions apart by
+    the value of the cell instead of parsing strings like 's5' and 'r3' on
+    every lexeme."""
+    def compile_cell(cell):
+        if cell == '.':
+            return ERROR
+        elif cell == '$':
+            return ACCEPT
+        elif cell[0] == 's':
+            return int(cell[1:])
+        elif cell[0] == 'r':
+            return -int(cell[1:]) - 1
+        else:
+            return int(cell)
+    return array('h', [compile_cell(cell)
+                       for row in state_map for cell in row])
+
+
+@lru_cache(maxsize=None)
 def generate_syntax_table():
-    g = closure_groups()
-    state_map = get_states_map(g)
-    return state_map
+    """Build the syntax table of the grammar.
+
+    The grammar is fixed, so the table is built once and shared by every
+    parser instance. It is built from syntax_closure_groups and
+    minimized."""
+    g = syntax_closure_groups()
+    state_map = minimize_states_map(get_states_map(g))
+    return compile_states_map(state_map)
 
 
 if __name__ == "__main__":
-    g = closure_groups()
+    g = syntax_closure_groups()
     print(g)
     for i in g:
         for input, target in i.goto.items():
             print("State: {}, Input: {}, Target: {}".format(i.label, input, target))
-    state_map = get_states_map(g)
+    state_map = minimize_states_map(get_states_map(g))
     print(state_map)
     args = ''.join(list(map(lambda x: '{:5s}', all_symbols)))
     s = "{:10s}" + args
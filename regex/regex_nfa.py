@@ -1,4 +1,13 @@
-"""define basis and induction rules of the nfa graph construction."""
+"""define basis and induction rules of the nfa graph construction.
+
+The induction rules consume their operand graphs: the path list of the
+first operand is extended in place and handed to the new graph, instead of
+copying every path of both operands on each reduction. The paths are added
+through Graph.add_paths, so an operand that is used again has its indexes
+built on its new paths rather than stale ones. Operands should still not be
+used again, nor be shared with any other graph; regex_compile hands out a
+copy of its cached graphs for this reason.
+"""
 
 
 from regex.graph import State, Path, Graph, Machine, epsilon
@@ -58,20 +67,21 @@ def induct_or(former: Graph, later: Graph, names=(None, None)):
 
                                  A
 
-    :param former: type Graph, base graph to construct or machine.
-    :param later: type Graph, base graph to construct or machine.
+    :param former: type Graph, base graph to construct or machine. It is
+        consumed, its paths list is extended in place and becomes the paths
+        of the new graph.
+    :param later: type Graph, base graph to construct or machine. It is
+        consumed, its paths are moved to the new graph.
     :param names: type list[int], the name for 2 new state needed in the machine.
     :return: type Graph, a new Graph type as nfa machine constructed.
     """
     init, finish = [State(names[i]) for i in range(2)]
-    paths = former.paths + later.paths
-    new_paths = [Path(init, former.start, epsilon),
-                 Path(init, later.start, epsilon),
-                 Path(former.finish, finish, epsilon),
-                 Path(later.finish, finish, epsilon)
-                 ]
-    paths = paths + new_paths
-    graph = Graph(paths, init, finish)
+    former.add_paths([*later.paths,
+                      Path(init, former.start, epsilon),
+                      Path(init, later.start, epsilon),
+                      Path(former.finish, finish, epsilon),
+                      Path(later.finish, finish, epsilon)])
+    graph = Graph(former.paths, init, finish)
     return graph
 
 
@@ -94,16 +104,18 @@ def induct_cat(former: Graph, later: Graph):
 
                                     A
 
-    :param former: type Graph.
-    :param later: type Graph.
+    :param former: type Graph. It is consumed, its paths list is extended in
+        place and becomes the paths of the new graph.
+    :param later: type Graph. It is consumed, its init state is replaced by
+        the finish state of former and its paths are moved to the new graph.
     :return: type Graph.
     """
     concat = former.finish
     later.alter_init_state(concat)
     init = former.start
     finish = later.finish
-    paths = former.paths + later.paths
-    graph = Graph(paths, init, finish)
+    former.add_paths(later.paths)
+    graph = Graph(former.paths, init, finish)
     return graph
 
 
@@ -128,16 +140,16 @@ def induct_star(graph: Graph, names = (None, None)):
                │                        ε     │
                └──────────────────────────────┘
 
-    :param graph: type Graph.
+    :param graph: type Graph. It is consumed, its paths list is extended in
+        place and becomes the paths of the new graph.
     :return: type Graph.
     """
     init, finish = [State(names[i]) for i in range(2)]
-    new_paths = [Path(init, graph.start, epsilon),
-                 Path(init, finish, epsilon),
-                 Path(graph.finish, finish, epsilon),
-                 Path(graph.finish, graph.start, epsilon)]
-    paths = graph.paths + new_paths
-    new_graph = Graph(paths, init, finish)
+    graph.add_paths((Path(init, graph.start, epsilon),
+                     Path(init, finish, epsilon),
+                     Path(graph.finish, finish, epsilon),
+                     Path(graph.finish, graph.start, epsilon)))
+    new_graph = Graph(graph.paths, init, finish)
     return new_graph
 
 
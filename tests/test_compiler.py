@@ -0,0 +1,84 @@
+import unittest
+
+from regex import regex_compile, parsing_table
+from regex.compiler import RegexCompiler
+from regex.graph import Graph, Machine
+from regex.regex_nfa import induct_star, induct_or, induct_cat
+
+
+class RegexCompileCacheTest(unittest.TestCase):
+    def test_machines_do_not_share_graphs(self):
+        a = regex_compile('ab')
+        b = regex_compile('ab')
+        self.assertIsNot(a.paths, b.paths)
+        self.assertFalse(set(map(id, a.paths)) & set(map(id, b.paths)))
+        self.assertFalse(set(map(id, a.get_states())) &
+                         set(map(id, b.get_states())))
+
+    def test_builders_do_not_change_the_cache(self):
+        induct_star(regex_compile('ab'))
+        induct_or(regex_compile('ab'), regex_compile('c'))
+        induct_cat(regex_compile('c'), regex_compile('ab'))
+        m = regex_compile('ab')
+        self.assertEqual(len(m.paths), 2)
+        self.assertTrue(m.match('ab'))
+        self.assertFalse(regex_compile('ab').match('abab'))
+        self.assertFalse(regex_compile('ab').match(''))
+
+
+class InvalidPatternTest(unittest.TestCase):
+    invalid = ('a)*', '(a', 'a||b', '*a', '()', '|a', 'a(', ')')
+    valid = {'a': ('a', ''), 'ab|c*': ('ccc', 'abc'),
+             '(a|b)*c': ('ababc', 'abca'), 'a(b)*': ('abb', 'ba')}
+
+    def tables(self):
+        canonical = parsing_table.compile_states_map(
+            parsing_table.get_states_map(parsing_table.closure_groups()))
+        return {'lalr': parsing_table.generate_syntax_table(),
+                'canonical': canonical}
+
+    def compile(self, table, regex):
+        compiler = RegexCompiler()
+        compiler.syntax_table = table
+        compiler.parse(regex)
+        return compiler.graph
+
+    def test_invalid_patterns_raise(self):
+        for name, table in self.tables().items():
+            for regex in self.invalid:
+                with self.subTest(table=name, regex=regex):
+                    with self.assertRaises(SyntaxError):
+                        self.compile(table, regex)
+        for regex in self.invalid:
+            with self.subTest(regex=regex):
+                with self.assertRaises(SyntaxError):
+                    regex_compile(regex)
+
+    def test_valid_patterns_match_alike(self):
+        for name, table in self.tables().items():
+            for regex, (match, mismatch) in self.valid.items():
+                with self.subTest(table=name, regex=regex):
+                    machine = Machine(self.compile(table, regex))
+                    self.assertTrue(machine.match(match))
+                    self.assertFalse(machine.match(mismatch))
+
+
+class ReusedOperandTest(unittest.TestCase):
+    def assert_indexes_follow_paths(self, machine):
+        fresh = Machine(Graph(machine.paths, machine.start, machine.finish))
+        for stream in ('', 'a', 'ab', 'abab', 'c', 'abc', 'cab'):
+            self.assertEqual(machine.match(stream), fresh.match(stream))
+
+    def test_operands_are_reindexed(self):
+        for build in (lambda m: induct_star(m),
+                      lambda m: induct_or(m, regex_compile('c')),
+                      lambda m: induct_cat(m, regex_compile('c')),
+                      lambda m: induct_cat(regex_compile('c'), m)):
+            machine = regex_compile('ab')
+            machine.match('ab')
+            build(machine)
+            self.assert_indexes_follow_paths(machine)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+
+import parser
+
+
+class GetStatesMapTest(unittest.TestCase):
+    def test_conflicting_cells_raise(self):
+        # [start -> stmt., if] reduces on 'if' where the stmt Item shifts
+        closure = parser.Closure(
+            {parser.Item('start', ('stmt', ), 1, frozenset({'if'})),
+             parser.Item('stmt', parser.grammar[2][1], 0,
+                         frozenset({'$'}))}, 0)
+        closure.goto = {'if': 1}
+        with self.assertRaises(ValueError):
+            parser.get_states_map([closure])
+
+
+class ItemTest(unittest.TestCase):
+    def test_items_are_not_equal_to_tuples(self):
+        item = parser.Item('start', ('stmt', ), 0, frozenset({'$'}))
+        self.assertEqual(item, parser.Item(*item))
+        self.assertNotEqual(item, tuple(item))
+        self.assertEqual(len({item, tuple(item)}), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from regex import parsing_table
+
+
+class MinimizeStatesMapTest(unittest.TestCase):
+    def test_equivalent_states_are_merged(self):
+        # 1 and 2 are the same, so are 3 and 4 once 1 and 2 are merged
+        state_map = [['s1', 's2', '.', '3'],
+                     ['r1', 's4', '$', '.'],
+                     ['r1', 's3', '$', '.'],
+                     ['s1', '.', 'r2', '.'],
+                     ['s2', '.', 'r2', '.']]
+        self.assertEqual(parsing_table.minimize_states_map(state_map),
+                         [['s1', 's1', '.', '2'],
+                          ['r1', 's2', '$', '.'],
+                          ['s1', '.', 'r2', '.']])
+
+    def test_start_state_merges_too(self):
+        # 2 behaves like the start state 0, so its cells target 0
+        state_map = [['s1', 's2'],
+                     ['r1', '.'],
+                     ['s1', 's2']]
+        minimized = parsing_table.minimize_states_map(state_map)
+        self.assertEqual(minimized, [['s1', 's0'], ['r1', '.']])
+        self.assertEqual(list(parsing_table.compile_states_map(minimized)),
+                         [1, 0, -2, parsing_table.ERROR])
+
+    def test_different_states_are_kept(self):
+        state_map = parsing_table.get_states_map(
+            parsing_table.syntax_closure_groups())
+        minimized = parsing_table.minimize_states_map(state_map)
+        self.assertEqual(minimized, state_map)
+
+
+
+class GetStatesMapTest(unittest.TestCase):
+    def test_conflicting_cells_raise(self):
+        bar = parsing_table.symbol_index['|']
+        end = parsing_table.symbol_index['$']
+        # [D -> K., |] reduces on '|' where [S -> S.|D, $] shifts
+        closure = parsing_table.Closure(
+            {parsing_table.Item.make('D', 'K', 1, bar),
+             parsing_table.Item.make('S', 'S|D', 1, end)}, 0)
+        closure.goto = {'|': 1}
+        with self.assertRaises(ValueError):
+            parsing_table.get_states_map([closure])
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class GetStatesMapTest(unittest.TestCase):
+    def test_conflicting_cells_raise(self):
+        closure = next(c for c in parsing_table.closure_groups()
+                       if any(i.pos == len(i.body) and i.symbol != 'R'
+                              for i in c))
+        item = next(i for i in closure
+                    if i.pos == len(i.body) and i.symbol != 'R')
+        # a shift on the lookahead of a complete Item clashes with its reduce
+        shift = parsing_table.Item.make('K', '(S)', 0, item.follow)
+        lookahead = parsing_table.all_symbols[item.follow]
+        clash = parsing_table.Item.make('K', lookahead, 0, item.follow)
+        broken = parsing_table.Closure(closure.sets | {clash}, closure.label)
+        broken.goto = dict(closure.goto, **{lookahead: 1})
+        with self.assertRaises(ValueError):
+            parsing_table.get_states_map([broken])
@@ -0,0 +1,28 @@
+import unittest
+
+import tokenizer
+
+
+class TokenizerTest(unittest.TestCase):
+    def test_symbol_sets_match_like_the_regex_machines(self):
+        self.assertTrue(tokenizer.space.match(' '))
+        self.assertTrue(tokenizer.delimiter.match(')'))
+        self.assertTrue(tokenizer.keyword('else'))
+        self.assertTrue(tokenizer.node('S2'))
+        self.assertFalse(tokenizer.space.match('  '))
+        self.assertFalse(tokenizer.keyword.match('ifelse'))
+        self.assertFalse(tokenizer.node('S'))
+
+    def test_tokens(self):
+        tokens = tokenizer.tokenizer('if(C) S1  else S2')
+        self.assertEqual([(t.typ, t.value) for t in tokens],
+                         [('if', 'if'), ('(', '('), ('C', 'C'), (')', ')'),
+                          ('S1', 'S1'), ('else', 'else'), ('S2', 'S2')])
+
+    def test_unknown_symbol_raises(self):
+        with self.assertRaises(RuntimeError):
+            list(tokenizer.tokenizer('ifC'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,12 +11,30 @@ Could parse:
 
 """
 
-from regex import regex_compile
+import re
 
-space = regex_compile(r" ")
-delimiter = regex_compile(r"\(|\)")
-keyword = regex_compile(r"(if)|(else)")
-node = regex_compile(r"(S1)|(S2)|C")
+
+class SymbolSet(frozenset):
+    """A fixed set of symbols, standing in for the regex machine that used to
+    recognize them. Calling it, or its match, tells whether a string is one
+    of the symbols."""
+
+    def match(self, stream):
+        return stream in self
+
+    __call__ = match
+
+
+space = SymbolSet((" ", ))
+delimiter = SymbolSet(("(", ")"))
+keyword = SymbolSet(("if", "else"))
+node = SymbolSet(("S1", "S2", "C"))
+
+# a delimiter, or a symbol running up to the next space or delimiter; spaces
+# are left out of every match so the scanner skips over them
+scanner = re.compile(r"[()]|[^ ()]+")
+# token type of every valid symbol: delimiters, keywords and nodes
+token_types = {symbol: symbol for symbol in delimiter | keyword | node}
 
 
 class Token:
@@ -31,43 +49,15 @@ class Token:
 def tokenizer(input_stream):
     """tokenizer.
 
-    :param input_stream:
-    :return:
-    """
-    def split(input_stream):
-        """split stream to a list that contains valid symbols.
-
-        :param input_stream: the input code string.
-        :return: a list.
-        """
-        symbol = ''
-        for i in input_stream:
-            if space.match(i):
-                # if has a valid symbol before space, save to list
-                #  but do nothing with space itself
-                if symbol:
-                    yield symbol
-                    symbol = ''
-            elif delimiter.match(i):
-                # need check whether there is a symbol
-                if symbol:
-                    yield symbol
-                    symbol = ''
-                # delimiter itself need to be added too
-                yield i
-            else:
-                symbol += i
-        # for the last symbol
-        if symbol:
-            yield symbol
-
-    def token(value):
-        if delimiter.match(value): return Token(value, value)
-        elif keyword.match(value): return Token(value, value)
-        elif node.match(value): return Token(value, value)
-        else: raise RuntimeError('"{}" unexpected symbol'.format(value))
-
-    l = split(input_stream)
-    return map(token, l)
-
+    Splits the stream to valid symbols with a single regex scanner and turns
+    them to tokens with a single lookup in token_types. Spaces are skipped.
 
+    :param input_stream: the input code string.
+    :return: an iterator of Token.
+    """
+    for match in scanner.finditer(input_stream):
+        value = match.group()
+        typ = token_types.get(value)
+        if typ is None:
+            raise RuntimeError('"{}" unexpected symbol'.format(value))
+        yield Token(typ, value)